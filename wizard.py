@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Interactive wizard helping to select a GPU suitable for passthrough to a
+Golem provider.
+
+It walks the IOMMU groups exposed under /sys/kernel/iommu_groups, keeps
+only the groups containing a cleanly isolated GPU (one VGA function, at
+most one audio function and at most one PCI bridge, nothing else) and
+lets the user pick one of the remaining candidates.
+"""
+
+import argparse
+import concurrent.futures
+import dataclasses
+import functools
+import os
+import shlex
+import subprocess
+import sys
+import textwrap
+
+PCI_VGA_CLASS_ID = "0300"
+PCI_AUDIO_CLASS_ID = "0403"
+PCI_BRIDGE_CLASS_ID = "0604"
+
+ALLOWED_CLASSES_WITH_BRIDGE = frozenset(
+    {PCI_VGA_CLASS_ID, PCI_AUDIO_CLASS_ID, PCI_BRIDGE_CLASS_ID}
+)
+ALLOWED_CLASSES_NO_BRIDGE = frozenset({PCI_VGA_CLASS_ID, PCI_AUDIO_CLASS_ID})
+
+
+@dataclasses.dataclass
+class PciDevice:
+    slot: str
+    klass: str
+    vid_pid: str
+    description: str
+    short_description: str
+    sysfs_link: str
+
+
+def get_class_from_slot(slot):
+    with open(f"/sys/bus/pci/devices/{slot}/class") as class_file:
+        # 0x030000 -> 0300: skip the prefix, drop the
+        # programming-interface byte.  The fields are fixed-width, so
+        # slicing beats split()/strip().
+        return class_file.read()[2:6]
+
+
+def get_pid_vid_from_slot(slot):
+    with open(f"/sys/bus/pci/devices/{slot}/vendor") as vendor_file:
+        vid = vendor_file.read()[2:6]
+    with open(f"/sys/bus/pci/devices/{slot}/device") as device_file:
+        pid = device_file.read()[2:6]
+    return f"{vid}:{pid}"
+
+
+def build_pci_inventory(sysfs_links):
+    """Build a slot -> PciDevice map in a single pass.
+
+    PCI IDs are read straight from the tiny
+    /sys/bus/pci/devices/<slot>/{class,vendor,device} files; only the
+    human-readable descriptions still need one batched lspci -Dmm call.
+    sysfs_links carries the symlink targets already collected by
+    walk_iommu_tree().  -D keeps the PCI domain in the slot so entries
+    match the device names found under /sys/kernel/iommu_groups.
+    """
+    inventory = {}
+    verbose = subprocess.run(
+        ["lspci", "-Dmm"], capture_output=True, text=True, check=True
+    )
+    for line in verbose.stdout.splitlines():
+        fields = shlex.split(line)
+        slot, device_class, vendor, device = fields[:4]
+        inventory[slot] = PciDevice(
+            slot=slot,
+            klass=get_class_from_slot(slot),
+            vid_pid=get_pid_vid_from_slot(slot),
+            description=f"{slot} {device_class}: {vendor} {device}",
+            short_description=f"{vendor} {device}",
+            sysfs_link=sysfs_links.get(slot, ""),
+        )
+    return inventory
+
+
+def walk_iommu_tree():
+    """Yield (iommu_group, slot, symlink_target) for every device of
+    every IOMMU group in a single sweep over /sys/kernel/iommu_groups.
+
+    The device symlinks point back into the PCI topology, so their
+    targets double as the sysfs links cached in the inventory.
+    """
+    with os.scandir("/sys/kernel/iommu_groups") as groups:
+        for group in groups:
+            try:
+                devices = os.scandir(os.path.join(group.path, "devices"))
+            except FileNotFoundError:
+                continue
+            with devices:
+                for device in devices:
+                    yield group.name, device.name, os.readlink(device.path)
+
+
+def list_pci_devices_in_iommu_group(devices, inventory):
+    return [inventory[device].description for device in devices]
+
+
+def check_vga_relationships(vga_slot, bridge_slot, audio_slot, inventory):
+    """Check the VGA function's ties to its bridge and audio function.
+
+    Returns (bridge_ok, supplier_ok); a missing bridge or audio slot is
+    vacuously fine.  The bridge test runs against the cached symlink
+    target, which already encodes the full PCI topology, so only the
+    supplier link costs a syscall.
+    """
+    bridge_ok = (
+        not bridge_slot
+        or f"/{bridge_slot}/{vga_slot}" in inventory[vga_slot].sysfs_link
+    )
+    supplier_ok = not audio_slot or os.path.exists(
+        f"/sys/bus/pci/devices/{vga_slot}/supplier:pci:{audio_slot}"
+    )
+    return bridge_ok, supplier_ok
+
+
+def parse_devices(devices, allowed_classes, inventory):
+    """Classify the group devices by PCI class.
+
+    Returns None as soon as the group is disqualified: a device of a
+    class outside allowed_classes, or more than one device of the same
+    allowed class.
+    """
+    parsed_devices = {}
+    for device in devices:
+        device_class = inventory[device].klass
+        if device_class not in allowed_classes:
+            return None
+        if device_class in parsed_devices:
+            return None
+        parsed_devices[device_class] = [device]
+    return parsed_devices
+
+
+def check_iommu_group(iommu_group, devices, allowed_classes, inventory):
+    """Validate one IOMMU group.
+
+    Returns ("gpu", entry) for a cleanly isolated GPU, ("bad",
+    iommu_group, descriptions) for a group containing a badly isolated
+    GPU, or None for groups without a GPU.
+    """
+    # Groups without a GPU are of no interest, skip them before doing
+    # any classification work.
+    if not any(
+        inventory[device].klass == PCI_VGA_CLASS_ID for device in devices
+    ):
+        return None
+    parsed_devices = parse_devices(devices, allowed_classes, inventory)
+    if parsed_devices is None:
+        return ("bad", iommu_group, list_pci_devices_in_iommu_group(devices, inventory))
+    vga_list = parsed_devices.get(PCI_VGA_CLASS_ID, ())
+    bridge_list = parsed_devices.get(PCI_BRIDGE_CLASS_ID, ())
+    audio_list = parsed_devices.get(PCI_AUDIO_CLASS_ID, ())
+    vga_device = vga_list[0]
+    pci_bridge_device = bridge_list[0] if bridge_list else ""
+    audio_device = audio_list[0] if audio_list else ""
+    bridge_ok, supplier_ok = check_vga_relationships(
+        vga_device, pci_bridge_device, audio_device, inventory
+    )
+    if not (bridge_ok and supplier_ok):
+        return ("bad", iommu_group, list_pci_devices_in_iommu_group(devices, inventory))
+    vga = inventory[vga_device]
+    return (
+        "gpu",
+        {
+            "description": vga.short_description,
+            "full_description": vga.description,
+            "slot": vga_device,
+            "vid_pid": vga.vid_pid,
+            "iommu_group": iommu_group,
+            "devices": devices,
+        },
+    )
+
+
+def select_gpu_compatible(allow_pci_bridge=True, jobs=None):
+    """Yield ("gpu", entry) and ("bad", iommu_group, descriptions)
+    results as IOMMU groups get validated.
+
+    Results stream in completion order, so callers can react to (or
+    stop consuming) candidates before the whole tree has been checked.
+    """
+    iommu_groups = {}
+    sysfs_links = {}
+    for iommu_group, slot, target in walk_iommu_tree():
+        iommu_groups.setdefault(iommu_group, []).append(slot)
+        sysfs_links[slot] = target
+    if not iommu_groups:
+        return
+    inventory = build_pci_inventory(sysfs_links)
+    if allow_pci_bridge:
+        allowed_classes = ALLOWED_CLASSES_WITH_BRIDGE
+    else:
+        allowed_classes = ALLOWED_CLASSES_NO_BRIDGE
+    # Each group check is dominated by blocking sysfs I/O, so overlap
+    # them with threads.
+    max_workers = min(32, jobs or os.cpu_count() or 1, len(iommu_groups))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                check_iommu_group, iommu_group, devices, allowed_classes, inventory
+            )
+            for iommu_group, devices in iommu_groups.items()
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            if result is not None:
+                yield result
+
+
+class WizardDialog:
+    """Stateless wrapper around a shared, lazily created Dialog."""
+
+    @classmethod
+    def _dialog(cls):
+        if not hasattr(cls, "dialog"):
+            # Imported lazily so that --help and scripted imports do not
+            # pay for loading pythondialog and probing the dialog binary.
+            from dialog import Dialog
+
+            cls.dialog = Dialog(dialog="dialog")
+            cls.dialog.set_background_title("Golem provider wizard")
+        return cls.dialog
+
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def _auto_height(width, text):
+        height = 4
+        for line in text.split("\n"):
+            height += max(1, len(textwrap.wrap(line, width - 4)))
+        return height
+
+    @classmethod
+    def msgbox(cls, text, width=70, **kwargs):
+        return cls._dialog().msgbox(
+            text, height=cls._auto_height(width, text), width=width, **kwargs
+        )
+
+    @classmethod
+    def yesno(cls, text, width=70, **kwargs):
+        return cls._dialog().yesno(
+            text, height=cls._auto_height(width, text), width=width, **kwargs
+        )
+
+    @classmethod
+    def menu(cls, text, choices, width=70, **kwargs):
+        return cls._dialog().menu(
+            text,
+            height=cls._auto_height(width, text) + len(choices) + 2,
+            width=width,
+            menu_height=len(choices),
+            choices=choices,
+            **kwargs,
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Select a GPU suitable for passthrough to a Golem provider"
+    )
+    parser.add_argument(
+        "--no-pci-bridge",
+        action="store_true",
+        help="Refuse IOMMU groups containing a PCI bridge",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of IOMMU groups to check in parallel",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    d = WizardDialog()
+    gpu_list = []
+    bad_isolation_groups = {}
+    for result in select_gpu_compatible(
+        allow_pci_bridge=not args.no_pci_bridge, jobs=args.jobs
+    ):
+        if result[0] == "gpu":
+            gpu_list.append(result[1])
+        else:
+            bad_isolation_groups[result[1]] = result[2]
+    # Results stream in completion order; sort by group for a stable
+    # display.
+    gpu_list.sort(key=lambda gpu: int(gpu["iommu_group"]))
+    for iommu_group in sorted(bad_isolation_groups, key=int):
+        msg = (
+            f"IOMMU Group '{iommu_group}' has bad isolation:\n\n"
+            + "\n".join(f"  {device}" for device in bad_isolation_groups[iommu_group])
+            + "\n"
+        )
+        d.msgbox(msg)
+    if not gpu_list:
+        d.msgbox("No GPU compatible with passthrough has been found.")
+        return 1
+    gpu_by_description = {gpu["description"]: gpu for gpu in gpu_list}
+    choices = [(gpu["description"], gpu["slot"]) for gpu in gpu_list]
+    code, gpu_tag = d.menu("Select the GPU to dedicate to Golem:", choices=choices)
+    if code != d._dialog().OK:
+        return 1
+    selected_gpu = gpu_by_description.get(gpu_tag)
+    d.msgbox(
+        f"Selected GPU: {selected_gpu['full_description']}\n\n"
+        f"IOMMU group: {selected_gpu['iommu_group']}\n"
+        f"Device: {selected_gpu['vid_pid']}"
+    )
+    print(selected_gpu["slot"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())